@@ -1,32 +1,51 @@
-from collections import defaultdict
-from typing import Dict, Tuple
+from binascii import hexlify
+from collections import Counter, defaultdict
+from functools import partial
+from typing import Dict, List, Tuple
 import argparse
 import csv
-import gzip
-import hashlib
 import logging
 import os.path
+import sys
 
 from graphtagger.logs import init_logging
+from graphtagger.seqOps import HASH_TAGS, seqHasher
 from graphtagger.tagOps import _check_tag_values, _validate_tags
-from graphtagger.utils import is_valid_gfa_file
+from graphtagger.utils import (
+    advise_sequential,
+    default_output_path,
+    drop_read_pages,
+    is_valid_gfa_file,
+    iter_line_blocks,
+    map_ordered,
+    open_gzip,
+)
 
 
-# TODO: Report total number of segments with updated tags.
-# Maybe have update_tags() return True if any changes were made.
-# May need to also count if any malformed tags are dumped from the Seg line.
+# Read/write buffer size for streaming GFA files
+IO_BUFFER_SIZE = 1 << 20
+# Size of output blocks written to disk
+WRITE_BUFFER_SIZE = 4 << 20
+# Size of input blocks read from disk and handed to a worker at a time
+READ_BLOCK_SIZE = 16 << 20
 
+# TODO: Count malformed tags dumped from Segment lines.
 
-def load_tags_from_csv(csv_file: str) -> defaultdict:
+
+def load_tags_from_csv(csv_file: str, delimiter: str = ",") -> defaultdict:
     """
     Load tag information from a CSV file into a nested dictionary.
 
+    Tags are stored ready to write, as "TAG:TYPE:VALUE" bytes, and are checked
+    against the GFA 1.0 spec once here rather than for every Segment line.
+
     Parameters:
     - csv_file (str): Path to the CSV file. Columns: Sequence name, Tag, Type, Value.
+    - delimiter (str): Column delimiter. Use "\t" for tab-separated input.
 
     Returns:
     - defaultdict: A nested dictionary where keys are sequence names, and values are dictionaries
-            with keys as tag names and values as tuples (Type, Value).
+            with keys as tag names and values as tuples (b"TAG:TYPE:VALUE", is_valid).
     """
 
     if not os.path.exists(csv_file):
@@ -38,34 +57,42 @@ def load_tags_from_csv(csv_file: str) -> defaultdict:
     tag_counts = defaultdict(int)
 
     logging.info(f"Loading new tag data from: {csv_file}")
-    with open(csv_file, "r") as csvfile:
-        reader = csv.reader(csvfile, delimiter=",")
-        for row in reader:
+    with open(csv_file, "rb", buffering=IO_BUFFER_SIZE) as csvfile:
+        for line in csvfile:
+            line = line.rstrip(b"\r\n")
+            # Split lines directly; only quoted fields need the csv module
+            if b'"' in line:
+                row = next(csv.reader([line.decode()], delimiter=delimiter), [])
+            else:
+                row = line.decode().split(delimiter) if line else []
             # Skip lines starting with "#" and check for missing values
             if not row or row[0].startswith("#"):
                 continue
             elif len(row) != 4 or "" in row:
                 # Log an error and skip the record
-                logging.warning(f"Skipping record due to missing values - {row}")
+                logging.warning("Skipping record due to missing values - %s", row)
                 continue
 
             # Load line data
-            sequence_name = row[0]
-            tag = row[1]
-            tag_type = row[2]
+            # Intern names, tags and types: these repeat across many records
+            sequence_name = sys.intern(row[0])
+            tag = sys.intern(row[1])
+            tag_type = sys.intern(row[2])
             value = row[3]
 
-            # Construct the tuple (Type, Value)
-            tag_info = (tag_type, value)
-
             # Check if the tag already exists for the sequence_name
             if tag in tag_dict[sequence_name]:
                 # Log a warning and do not overwrite the existing tag_info
                 logging.warning(
-                    f"Tag '{tag}' already loaded for sequence '{sequence_name}'. Skipping csv duplicate."
+                    "Tag '%s' already loaded for sequence '%s'. Skipping csv duplicate.",
+                    tag,
+                    sequence_name,
                 )
             else:
-                # Add the tag info (TYPE,VALUE) to the internal TAG dictionary for SEQUENCE
+                # Format the tag and validate it against the GFA 1.0 Spec
+                formatted_tag = f"{tag}:{tag_type}:{value}"
+                tag_info = (formatted_tag.encode(), _validate_tags([formatted_tag]))
+                # Add the tag info to the internal TAG dictionary for SEQUENCE
                 tag_dict[sequence_name][tag] = tag_info
                 # Track instances of TAG:TYPE combinations
                 tag_counts[f"{tag}:{tag_type}"] += 1
@@ -80,97 +107,217 @@ def load_tags_from_csv(csv_file: str) -> defaultdict:
     return tag_dict
 
 
-def format_tags(sub_dict: Dict[str, Tuple[str, str]], strict: bool = False) -> str:
+def merge_tags(
+    segment_tags: Dict[str, Tuple[bytes, bool]],
+    csv_entries: Dict[str, Tuple[bytes, bool]],
+    preserve: bool = True,
+    stats: Counter = None,
+) -> Dict[str, Tuple[bytes, bool]]:
     """
-    Format the sub_dict into a string of tab-delimited tags.
+    Merge csv tags for one segment into that segment's existing tags.
 
     Parameters:
-    - sub_dict (Dict[str, Tuple[str, str]]): The sub-dictionary for one sequence_name.
+    - segment_tags (Dict[str, Tuple[bytes, bool]]): Existing tags keyed by tag name. Updated in place.
+    - csv_entries (Dict[str, Tuple[bytes, bool]]): New tags for the segment, i.e. tag_dict.get(name, {}).
+    - preserve (bool): If True, keep existing values; if False, overwrite them with csv values.
+    - stats (Counter): Optional running counts of added/overwritten/preserved tags.
 
     Returns:
-    - str: The formatted tags string.
+    - Dict[str, Tuple[bytes, bool]]: The updated segment_tags.
     """
-    formatted_tags = []
+    if stats is None:
+        stats = Counter()
+    for tag_name, tag_info in csv_entries.items():
+        if tag_name not in segment_tags:
+            segment_tags[tag_name] = tag_info
+            stats["added"] += 1
+        elif not preserve:
+            segment_tags[tag_name] = tag_info
+            stats["overwritten"] += 1
+        else:
+            stats["preserved"] += 1
+    return segment_tags
 
-    # Sort tag_name keys in sub_dict
-    sorted_tag_names = sorted(sub_dict.keys())
 
-    for tag_name in sorted_tag_names:
-        # Fetch tag type and value
-        tag_type, value = sub_dict[tag_name]
-        # Construct tag
-        formatted_tag = f"{tag_name}:{tag_type}:{value}"
-        # Validate tag against GFA 1.0 Spec
-        tag_is_valid = _validate_tags([formatted_tag])
-        # If strict mode, only write tags that pass checks
-        if strict and tag_is_valid:
-            # Add to tag list
-            formatted_tags.append(formatted_tag)
-        # If not strict mode write all tags
-        elif not strict:
-            # Add to tag list
-            formatted_tags.append(formatted_tag)
+def update_segment_line(
+    line: bytes,
+    tag_dict: Dict[str, Dict[str, Tuple[bytes, bool]]],
+    stats: Counter,
+    preserve: bool = True,
+    calcLen: bool = False,
+    calcHash: bool = False,
+    enforceSpec: bool = False,
+    hashAlg: str = "sha256",
+) -> bytes:
+    """
+    Update the tags on a single GFA line. Non-Segment lines are returned unchanged.
+
+    Parameters:
+    - line (bytes): Raw GFA line.
+    - tag_dict (Dict[str, Dict[str, Tuple[bytes, bool]]]): Tags loaded by load_tags_from_csv().
+    - stats (Counter): Running counts of updated segments and added/overwritten/preserved tags.
+    - preserve, calcLen, calcHash, enforceSpec, hashAlg: As for update_gfa_tags().
+
+    Returns:
+    - bytes: The updated line, including the trailing newline.
+    """
+    line = line.strip().split(b"\t")
+
+    # If not a Segment line, return the line unchanged
+    if line[0] != b"S":
+        return b"\t".join(line) + b"\n"
+
+    sequence_name = line[1].decode()
+    dna_sequence = line[2]
+    segment_tag_fields = [tag.decode() for tag in line[3:]]
+
+    # Check LN and SH are vaild if present
+    _check_tag_values(sequence_name, dna_sequence, segment_tag_fields)
+
+    # Tags for this segment, keyed by tag name. Values are (b"TAG:TYPE:VALUE", is_valid),
+    # where is_valid is None until the tag has been checked against the GFA spec.
+    segment_tags = {}
+
+    # Load tags from Column 4 onwards into the segment_tags dict
+    for tag_bytes, tag_info in zip(line[3:], segment_tag_fields):
+        # Split tag on the first two ":" only. The value may contain ":"
+        # characters, i.e. in JSON tags.
+        tag_parts = tag_info.split(":", 2)
+        # Check that tag has three segments
+        if len(tag_parts) == 3:
+            # Unpack tag parts to TAG, TYPE, VALUE
+            tag_name = sys.intern(tag_parts[0])
+            tag_type = tag_parts[1]
+            tag_value = tag_parts[2]
+
+            # Log error if ":" in value of non-JSON tag
+            if ":" in tag_value and tag_type != "J":
+                logging.warning(
+                    "Possible malformed tag. Contains ':' in value field. Use '--strict' to skip.: %s",
+                    tag_info,
+                )
+
+            # Reject if whitespace found in tag name
+            if " " in tag_name:
+                logging.warning(
+                    'Skipping malformed tag, contains whitespace, tags bust be tab-separated: "%s"',
+                    tag_info,
+                )
+                continue
+
+            # Raise warning if duplicate tag name exists in input gfa
+            if tag_name in segment_tags:
+                logging.warning(
+                    "Pre-existing duplicate of tag '%s' in segment line '%s'.",
+                    tag_name,
+                    sequence_name,
+                )
+
+            # Add new tag to segment dict, or overwrite duplicate if exists
+            segment_tags[tag_name] = (tag_bytes, None)
         else:
-            logging.warning(f"Skipping invalid tag: {formatted_tag}")
+            # Log a warning and skip the tag_info item if < 3 parts
+            logging.warning("Skipping malformed tag_info: %s", tag_info)
+
+    # Add a new tag to the segment_tags dict if calcLen is True
+    if calcLen:
+        segment_tags["LN"] = (b"LN:i:%d" % len(dna_sequence), True)
+
+    # Add new SH (or B3) tag to segment_tags dict if calcHash is True
+    if calcHash:
+        hasher = seqHasher(hashAlg)
+        hasher.update(dna_sequence)
+        hash_tag = HASH_TAGS[hashAlg]
+        segment_tags[hash_tag] = (
+            b"%s:H:%s" % (hash_tag.encode(), hexlify(hasher.digest())),
+            True,
+        )
+
+    # Merge csv tags into the segment tags
+    if sequence_name in tag_dict:
+        stats["segments"] += 1
+        merge_tags(segment_tags, tag_dict[sequence_name], preserve, stats)
+
+    # Write tags sorted by name
+    formatted_tags = []
+    for tag_name in sorted(segment_tags):
+        formatted_tag, tag_is_valid = segment_tags[tag_name]
+        # Validate tags from the input gfa against GFA 1.0 Spec
+        if tag_is_valid is None:
+            tag_is_valid = _validate_tags([formatted_tag.decode()])
+        # If strict mode, only write tags that pass checks
+        if enforceSpec and not tag_is_valid:
+            logging.warning("Skipping invalid tag: %s", formatted_tag.decode())
+            continue
+        formatted_tags.append(formatted_tag)
 
-    # Join tags with tabs
-    return "\t".join(formatted_tags)
+    # Append the formatted tags to the end of the line
+    return b"S\t%s\t%s\t%s\n" % (line[1], dna_sequence, b"\t".join(formatted_tags))
 
 
-def update_tags(
-    tag_dict1: Dict[str, Dict[str, Tuple[str, str]]],
-    tag_dict2: Dict[str, Dict[str, Tuple[str, str]]],
-    preserve: bool = True,
-) -> Dict[str, Dict[str, Tuple[str, str]]]:
+# Tags that update_segment_line() checks against the segment sequence
+_CHECKED_TAGS = (b"\tLN:", b"\tSH:", b"\tB3:")
+
+
+def update_segment_lines(
+    lines: List[bytes], segment_names: frozenset = None, **kwargs
+) -> Tuple[bytes, Counter]:
     """
-    Update tag data for each sequence in the second tag_dict using data from the first tag_dict.
+    Update a batch of GFA lines with update_segment_line().
 
     Parameters:
-    - tag_dict1 (Dict[str, Dict[str, Tuple[str, str]]]): The first tag dictionary.
-    - tag_dict2 (Dict[str, Dict[str, Tuple[str, str]]]): The second tag dictionary.
-    - preserve (bool): If True, preserve existing values in tag_dict2; if False, overwrite existing values.
+    - lines (List[bytes]): Raw GFA lines.
+    - segment_names (frozenset): Names (as bytes) of the only segments that need updating.
+                                 If None, every Segment line is updated.
+    - kwargs: Passed to update_segment_line().
 
     Returns:
-    - Dict[str, Dict[str, Tuple[str, str]]]: The updated tag_dict2.
+    - Tuple[bytes, Counter]: The joined output lines and the update counts for this batch.
     """
-
-    for sequence_name in tag_dict2:
-        # Check if the sequence exists in the first dictionary
-        if sequence_name in tag_dict1:
-            tags1 = tag_dict1[sequence_name]
-            tags2 = tag_dict2[sequence_name]
-
-            for tag_name, (type1, value1) in tags1.items():
-                # Check if the tag exists in the second dictionary
-                if tag_name in tags2:
-                    if not preserve:
-                        # Overwrite the value in the second dictionary
-                        tags2[tag_name] = (type1, value1)
-                        logging.info(
-                            f"Overwriting value for tag '{tag_name}' in sequence '{sequence_name}'"
+    stats = Counter()
+    # Bind the per-line function once for the batch
+    update_line = partial(update_segment_line, stats=stats, **kwargs)
+
+    # Lines that update_segment_line() would return unchanged are copied here
+    # instead, which avoids a function call and a full split for most lines.
+    updated_lines = []
+    for line in lines:
+        if line.startswith(b"S\t"):
+            if segment_names is not None:
+                # Find the name and the start of the tags without copying the sequence
+                name_end = line.find(b"\t", 2)
+                name = line[2:name_end]
+                if name not in segment_names:
+                    # Still check LN/SH/B3 tags against the sequence, if present
+                    tags_start = line.find(b"\t", name_end + 1)
+                    if tags_start != -1 and any(
+                        line.find(tag, tags_start) != -1 for tag in _CHECKED_TAGS
+                    ):
+                        _check_tag_values(
+                            name.decode(),
+                            memoryview(line)[name_end + 1 : tags_start],
+                            line[tags_start + 1 :].rstrip().decode().split("\t"),
                         )
-                    else:
-                        logging.info(
-                            f"Preserve=True: Retain existing tag '{tag_name}' in sequence '{sequence_name}'"
-                        )
-                else:
-                    # Add the new tag to the second dictionary
-                    tags2[tag_name] = (type1, value1)
-                    logging.info(
-                        f"Adding new tag '{tag_name}' to sequence '{sequence_name}'"
-                    )
-
-    return tag_dict2
+                    updated_lines.append(line.rstrip(b"\r\n") + b"\n")
+                    continue
+        elif line[:1] != b"S" and not line[:1].isspace():
+            # Other record types are written with trailing whitespace removed
+            updated_lines.append(line.rstrip() + b"\n")
+            continue
+        updated_lines.append(update_line(line))
+    return b"".join(updated_lines), stats
 
 
 def update_gfa_tags(
     input_file: str,
     output_file: str,
-    tag_dict: Dict[str, Dict[str, Tuple[str, str]]],
+    tag_dict: Dict[str, Dict[str, Tuple[bytes, bool]]],
     preserve: bool = True,
     calcLen: bool = False,
     calcHash: bool = False,
     enforceSpec: bool = False,
+    threads: int = 1,
+    hashAlg: str = "sha256",
 ):
     """
     Read a GFA file, update the Segment lines with information from tag_dict, and write to an output file.
@@ -178,10 +325,13 @@ def update_gfa_tags(
     Parameters:
     - input_file (str): Path to the input GFA file.
     - output_file (str): Path to the output file.
-    - tag_dict (Dict[str, Dict[str, Tuple[str, str]]]): The tag dictionary for updating Segment lines.
+    - tag_dict (Dict[str, Dict[str, Tuple[bytes, bool]]]): Tags loaded by load_tags_from_csv().
     - preserve (bool): If True, preserve existing values in tag_dict2; if False, overwrite existing values.
     - calcLen (bool): If True, add a new tag to the segment_tags dict with tag_name = "LN",
                      tag_type = "i", and value = len(dna_sequence).
+    - threads (int): Number of worker threads used to update batches of lines.
+    - hashAlg (str): Checksum algorithm for calcHash. "sha256" writes SH tags,
+                     "blake3" writes non-standard B3 tags.
     """
 
     # Determine if the input file is gzipped
@@ -189,117 +339,69 @@ def update_gfa_tags(
 
     # If output_gfa is not provided, derive the output filename based on input
     if output_file is None:
-        if is_gzipped:
-            file_root, base_ext = os.path.splitext(input_file)
-            output_file = os.path.splitext(file_root)[0] + ".tagged.gfa"
-        else:
-            output_file = os.path.splitext(input_file)[0] + ".tagged.gfa"
+        output_file = default_output_path(input_file, ".tagged.gfa")
+
+    # Segments without csv tags are written unchanged unless they need new LN/SH
+    # tags or strict checks, which skips parsing for most lines of large graphs.
+    # Their existing LN/SH tags are still checked.
+    if calcLen or calcHash or enforceSpec:
+        segment_names = None
+    else:
+        segment_names = frozenset(name.encode() for name in tag_dict)
+
+    # Worker to update a batch of lines
+    worker = partial(
+        update_segment_lines,
+        segment_names=segment_names,
+        tag_dict=tag_dict,
+        preserve=preserve,
+        calcLen=calcLen,
+        calcHash=calcHash,
+        enforceSpec=enforceSpec,
+        hashAlg=hashAlg,
+    )
+
+    # Fail before writing any output if the hash algorithm is unavailable
+    if calcHash:
+        seqHasher(hashAlg)
+
+    # Counters for the update summary
+    stats = Counter()
 
     # Open the output GFA file for writing
     logging.info(f"Writing updated gfa to file: {output_file}")
-    with open(output_file, "w") as outfile:
-        # Open the input file accordingly (regular or gzipped)
+    # Output is collected in a scratch buffer and written in large blocks.
+    # Large writes bypass the file's own buffer, which also retries short writes.
+    out_buffer = bytearray()
+    with open(output_file, "wb") as outfile:
+        # Open the input file accordingly (regular or gzipped) in binary mode.
+        # Sequences are kept as bytes; only names and tags are decoded.
         logging.info(f"Reading seq records from: {input_file}")
-        with gzip.open(input_file, "rt") if is_gzipped else open(
-            input_file, "r"
+        with open_gzip(
+            input_file, "rb", buffer_size=IO_BUFFER_SIZE
+        ) if is_gzipped else open(
+            input_file, "rb", buffering=IO_BUFFER_SIZE
         ) as infile:
-            # Process each line from the input gfa
-            for line in infile:
-                line = line.strip().split("\t")
-
-                # Check if the line is a Segment line (starts with 'S')
-                if line[0] == "S":
-                    sequence_name = line[1]
-                    dna_sequence = line[2]
-
-                    # Check LN and SH are vaild if present
-                    _check_tag_values(sequence_name, dna_sequence, line[3:])
-
-                    # Initialize segment_tags as a defaultdict of dicts
-                    segment_tags = defaultdict(dict)
-
-                    # Load tags from Column 4 onwards into the segment_tags dict
-                    for tag_info in line[3:]:
-                        # Split tag on ":"
-                        tag_parts = tag_info.split(":")
-                        # Check that tag has three segments
-                        if len(tag_parts) >= 3:
-                            # Unpack tag parts to TAG, TYPE, VALUE
-                            tag_name = tag_parts[0]
-                            tag_type = tag_parts[1]
-                            # Reassemble downstream splits in the value in case it contained ":" characters.
-                            # This may happen in JSON tags.
-                            tag_value = ":".join(
-                                tag_parts[2:]
-                            )  # tag value may contain : characters
-
-                            # Log error if ":" in value of non-JSON tag
-                            if ":" in tag_value and tag_type != "J":
-                                logging.warning(
-                                    f"Possible malformed tag. Contains ':' in value field. Use '--strict' to skip.: {tag_info}"
-                                )
-
-                            # Reject if whitespace found in tag name
-                            if " " in tag_name:
-                                logging.warning(
-                                    f'Skipping malformed tag, contains whitespace, tags bust be tab-separated: "{tag_info}"'
-                                )
-                                continue
-
-                            # Raise warning if duplicate tag name exists in input gfa
-                            if tag_name in segment_tags[sequence_name]:
-                                logging.warning(
-                                    f"Pre-existing duplicate of tag '{tag_name}' in segment line '{sequence_name}'."
-                                )
-
-                            # Add new tag to segment dict, or overwrite duplicate if exists
-                            segment_tags[sequence_name][tag_name] = (
-                                tag_type,
-                                tag_value,
-                            )
-                        else:
-                            # Log a warning and skip the tag_info item if < 3 parts
-                            logging.warning(f"Skipping malformed tag_info: {tag_info}")
-
-                    # Add a new tag to the segment_tags dict if calcLen is True
-                    if calcLen:
-                        segment_tags[sequence_name]["LN"] = (
-                            "i",
-                            str(len(dna_sequence)),
-                        )
-
-                    # Add new SH tag to segment_tags dict if calcHash is True
-                    if calcHash:
-                        checksum = hashlib.sha256(
-                            str(dna_sequence).encode()
-                        ).hexdigest()
-                        segment_tags[sequence_name]["SH"] = (
-                            "H",
-                            str(checksum),
-                        )
-
-                    # If no tags have been found for this segment, init an empty tag_dict
-                    # This gives update_tags() somewhere to copy the csv_tags into
-                    if sequence_name not in segment_tags:
-                        segment_tags[sequence_name] = {}
-
-                    # Update segment_tags using the CSV tag_dict
-                    updated_tags = update_tags(
-                        tag_dict, segment_tags, preserve=preserve
-                    )
-
-                    # Format the updated tags into a string
-                    formatted_tags = format_tags(
-                        updated_tags[sequence_name], strict=enforceSpec
-                    )
-
-                    # Append the formatted tags to the end of the line
-                    updated_line = f"{line[0]}\t{sequence_name}\t{dna_sequence}\t{formatted_tags}\n"
-                    outfile.write(updated_line)
-                else:
-                    # If not a Segment line, write the line to the output file unchanged
-                    outfile.write("\t".join(line) + "\n")
-
+            advise_sequential(infile)
+            # Read large blocks of lines, update each block, then write the
+            # results in input order. Blocks are updated in parallel if threads > 1.
+            # Hashing releases the GIL, so threads pay off with --calc_hash.
+            batches = iter_line_blocks(infile, READ_BLOCK_SIZE)
+            for updated_lines, batch_stats in map_ordered(worker, batches, threads):
+                out_buffer += updated_lines
+                if len(out_buffer) >= WRITE_BUFFER_SIZE:
+                    outfile.write(out_buffer)
+                    out_buffer.clear()
+                    # Input lines written so far are not needed in the page cache
+                    drop_read_pages(infile)
+                stats.update(batch_stats)
+        # Write any remaining output
+        outfile.write(out_buffer)
+
+    logging.info(
+        f"Updated {stats['segments']} segments with csv tags: {stats['added']} added, "
+        f"{stats['overwritten']} overwritten, {stats['preserved']} existing tags preserved."
+    )
     logging.info("Finished updating tags.")
 
 
@@ -320,6 +422,12 @@ def getArgs():
         required=True,
         help="Path to the input CSV file containing tag information. Format = [NAME,TAG,TYPE,VALUE].",
     )
+    parser.add_argument(
+        "--tsv",
+        default=False,
+        action="store_true",
+        help="If set, the tag file is tab-separated instead of comma-separated.",
+    )
     parser.add_argument(
         "-o",
         "--output_gfa",
@@ -348,12 +456,26 @@ def getArgs():
         action="store_true",
         help="If set, calculate new SH tags from sha256 hash of sequence.",
     )
+    parser.add_argument(
+        "--hash_alg",
+        default="sha256",
+        choices=sorted(HASH_TAGS),
+        help="Hash algorithm for --calc_hash. 'blake3' is much faster on long sequences "
+        "but writes non-standard B3 tags instead of SH. Default: [sha256]",
+    )
     parser.add_argument(
         "--strict",
         default=False,
         action="store_true",
         help="If set, reject any new or existing tags that do not strictly comply with the GFA 1.0 specification.",
     )
+    parser.add_argument(
+        "-t",
+        "--threads",
+        default=1,
+        type=int,
+        help="Number of threads to use. Default: [1]",
+    )
     # Parse command line arguments
     return parser.parse_args()
 
@@ -370,7 +492,7 @@ def main():
         return
 
     # Load CSV tags
-    csv_tags = load_tags_from_csv(args.input_csv)
+    csv_tags = load_tags_from_csv(args.input_csv, delimiter="\t" if args.tsv else ",")
 
     # Update gfa tags with tags from csv file
     update_gfa_tags(
@@ -381,6 +503,8 @@ def main():
         calcLen=args.calc_len,
         calcHash=args.calc_hash,
         enforceSpec=args.strict,
+        threads=args.threads,
+        hashAlg=args.hash_alg,
     )
 
 
@@ -1,15 +1,15 @@
+from binascii import hexlify
 from typing import Optional
 import argparse
-import gzip
-import hashlib
 import logging
-import os
-
-from Bio import SeqIO
 
 from graphtagger.logs import init_logging
-from graphtagger.utils import is_valid_fasta_file
+from graphtagger.seqOps import HASH_TAGS, readFastaChunks, seqHasher
+from graphtagger.utils import default_output_path, is_valid_fasta_file
+
 
+# Size of output blocks written to disk
+WRITE_BUFFER_SIZE = 4 << 20
 
 # gfa2fa
 # Support headers longer than 80 chars, no tags
@@ -44,13 +44,23 @@ def getArgs():
         action="store_true",
         help="If set, calculate new SH tags from sha256 hash of sequence.",
     )
+    parser.add_argument(
+        "--hash_alg",
+        default="sha256",
+        choices=sorted(HASH_TAGS),
+        help="Hash algorithm for --calc_hash. 'blake3' is much faster on long sequences "
+        "but writes non-standard B3 tags instead of SH. Default: [sha256]",
+    )
 
     # Parse command line arguments
     return parser.parse_args()
 
 
 def convert_fasta_to_gfa(
-    input_fasta: str, output_gfa: Optional[str] = None, calcHash: bool = False
+    input_fasta: str,
+    output_gfa: Optional[str] = None,
+    calcHash: bool = False,
+    hashAlg: str = "sha256",
 ) -> None:
     """
     Convert FASTA file to GFA format.
@@ -59,48 +69,76 @@ def convert_fasta_to_gfa(
         input_fasta (str): Path to the input FASTA file (can be gzipped).
         output_gfa (str, optional): Path to the output GFA file. If not provided,
             the output file will have the same basename as the input with the ".gfa" extension.
+        calcHash (bool): If True, add a checksum tag for each sequence.
+        hashAlg (str): Checksum algorithm. "sha256" writes SH tags, "blake3" writes B3 tags.
     """
 
     # Validate the input file
     if not is_valid_fasta_file(input_fasta):
         return
 
-    # Determine if the input file is gzipped
-    is_gzipped = input_fasta.endswith(".gz")
-
     # If output_gfa is not provided, derive the output filename based on input
     if output_gfa is None:
-        if is_gzipped:
-            file_root, base_ext = os.path.splitext(input_fasta)
-            output_gfa = os.path.splitext(file_root)[0] + ".gfa"
-        else:
-            output_gfa = os.path.splitext(input_fasta)[0] + ".gfa"
+        output_gfa = default_output_path(input_fasta, ".gfa")
+
+    # Fail before writing any output if the hash algorithm is unavailable
+    if calcHash:
+        seqHasher(hashAlg)
+
+    # Checksum tag prefix, i.e. b"\tSH:H:"
+    hash_tag = b"\t%s:H:" % HASH_TAGS[hashAlg].encode()
 
     # Open the output GFA file for writing
     logging.info(f"Writing gfa to file: {output_gfa}")
-    with open(output_gfa, "w") as output_file:
-        # Open the input file accordingly (regular or gzipped)
+    # Output is collected in a scratch buffer and written in large blocks.
+    # Large writes bypass the file's own buffer, which also retries short writes.
+    out_buffer = bytearray()
+    with open(output_gfa, "wb") as output_file:
         logging.info(f"Reading seq records from: {input_fasta}")
-        with gzip.open(input_fasta, "rt") if is_gzipped else open(
-            input_fasta, "r"
-        ) as input_file:
-            seq_count = 0
-            # Read records from the FASTA file one at a time
-            for seq_record in SeqIO.parse(input_file, "fasta"):
-                # Add new SH tag to segment_tags dict if calcHash is True
-                if calcHash:
-                    # Calculate sha256 hash of the sequence
-                    checksum = hashlib.sha256(str(seq_record.seq).encode()).hexdigest()
-                    # Write the information from the current seqRecord to the output file in gfa segment line format
-                    output_file.write(
-                        f"S\t{seq_record.id}\t{str(seq_record.seq)}\tLN:i:{len(seq_record)}\tSH:H:{checksum}\n"
-                    )
-                else:
-                    # Write the information from the current seqRecord to the output file in gfa segment line format
-                    output_file.write(
-                        f"S\t{seq_record.id}\t{str(seq_record.seq)}\tLN:i:{len(seq_record)}\n"
-                    )
-                seq_count += 1
+        seq_count = 0
+        # Read records from the FASTA file one at a time.
+        # Sequence chunks are streamed into the output buffer, and hashed from
+        # it in large blocks, so long records need not be copied again and
+        # memory use does not grow with record length.
+        for seq_id, chunks in readFastaChunks(input_fasta):
+            out_buffer += b"S\t%s\t" % seq_id
+            seq_start = len(out_buffer)
+            seq_len = 0
+            # Calculate hash of the sequence if calcHash is True
+            hasher = seqHasher(hashAlg) if calcHash else None
+            for chunk in chunks:
+                seq_len += len(chunk)
+                if len(chunk) >= WRITE_BUFFER_SIZE:
+                    # Large chunks (i.e. unwrapped sequence lines) are hashed and
+                    # written directly, after any buffered output, without
+                    # being copied into the buffer.
+                    if calcHash:
+                        hasher.update(memoryview(out_buffer)[seq_start:])
+                        hasher.update(chunk)
+                    output_file.write(out_buffer)
+                    output_file.write(chunk)
+                    out_buffer.clear()
+                    seq_start = 0
+                    continue
+                out_buffer += chunk
+                if len(out_buffer) >= WRITE_BUFFER_SIZE:
+                    if calcHash:
+                        hasher.update(memoryview(out_buffer)[seq_start:])
+                    output_file.write(out_buffer)
+                    out_buffer.clear()
+                    seq_start = 0
+            # Finish the segment line with LN and optional SH tags
+            if calcHash:
+                hasher.update(memoryview(out_buffer)[seq_start:])
+                out_buffer += b"\tLN:i:%d" % seq_len
+                out_buffer += hash_tag
+                out_buffer += hexlify(hasher.digest())
+                out_buffer += b"\n"
+            else:
+                out_buffer += b"\tLN:i:%d\n" % seq_len
+            seq_count += 1
+        # Write any remaining output
+        output_file.write(out_buffer)
 
     logging.info(f"Converted {seq_count} records to gfa.")
 
@@ -113,7 +151,9 @@ def main():
     args = getArgs()
 
     # Convert FASTA to GFA
-    convert_fasta_to_gfa(args.input_fasta, args.output_gfa, args.calc_hash)
+    convert_fasta_to_gfa(
+        args.input_fasta, args.output_gfa, args.calc_hash, hashAlg=args.hash_alg
+    )
 
 
 if __name__ == "__main__":
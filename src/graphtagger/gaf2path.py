@@ -14,6 +14,16 @@ from graphtagger.logs import init_logging
 # TODO: add default outfile naming
 # TODO: Support input GFA file + append new paths to file end
 
+# Read/write buffer size for streaming GAF and GFA files
+IO_BUFFER_SIZE = 1 << 20
+# Number of path lines collected before each write
+WRITE_BATCH_SIZE = 4096
+
+# Segment orientation and name pairs in a GAF path, i.e. ">12<33"
+_PATH_RE = re.compile(r"([<>])([^<>]*)")
+# GAF orientation symbols as GFA orientations
+_ORIENTATION = {">": "+", "<": "-"}
+
 
 def count_symbols(input_string: str) -> int:
     """
@@ -25,11 +35,9 @@ def count_symbols(input_string: str) -> int:
     Returns:
         int: The number of instances of ">" or "<" in the string.
     """
-    count = 0
-
-    count = input_string.count(">") + input_string.count("<")
-
-    return count
+    # Two str.count() calls are each a single C-level scan, and together are
+    # faster than a str.translate() pass, which must build a new string.
+    return input_string.count(">") + input_string.count("<")
 
 
 def format_path_string(input_string: str) -> str:
@@ -43,17 +51,13 @@ def format_path_string(input_string: str) -> str:
         str: The formatted comma-delimited string.
     """
     # Use regular expression to find pairs of numbers and their preceding characters
-    matches = re.findall(r"([<>])([^<>]*)", input_string)
-
-    # Convert the matches to tuples with ">" replaced by "+" and "<" replaced by "-"
-    result_tuples: List[Tuple[str, int]] = [
-        (char.replace(">", "+").replace("<", "-"), name) for char, name in matches
-    ]
+    return _join_path_matches(_PATH_RE.findall(input_string))
 
-    # Convert the list of tuples to a string
-    result_string = ", ".join([f"{num}{char}" for char, num in result_tuples])
 
-    return result_string
+def _join_path_matches(matches: List[Tuple[str, str]]) -> str:
+    """Format (orientation, name) pairs from _PATH_RE as a GFA segment list (PRIVATE)."""
+    # Convert ">" to "+" and "<" to "-" after each name
+    return ", ".join([f"{name}{_ORIENTATION[char]}" for char, name in matches])
 
 
 def process_gaf_file(input_file: str, output_file: str) -> None:
@@ -69,7 +73,11 @@ def process_gaf_file(input_file: str, output_file: str) -> None:
     line_counter = 0
 
     # Open input and output files
-    with open(input_file, "r") as infile, open(output_file, "w") as outfile:
+    with open(input_file, "r", buffering=IO_BUFFER_SIZE) as infile, open(
+        output_file, "w", buffering=IO_BUFFER_SIZE
+    ) as outfile:
+        # Path lines waiting to be written
+        out_lines = []
         for line in infile:
             # Skip lines starting with "#"
             if line.startswith("#"):
@@ -77,18 +85,22 @@ def process_gaf_file(input_file: str, output_file: str) -> None:
             # Count alignment line
             line_counter += 1
 
-            # Split line into columns
-            columns = line.strip().split("\t")
+            # Split line into columns. Only the first 12 (required) columns
+            # are split out; optional tags are left together in the last field.
+            columns = line.strip().split("\t", 11)
 
             # Check if line has at least 12 columns
             if len(columns) >= 12:
                 # Extract string in $6
                 path_string = columns[5]
 
+                # Find oriented segments in the path, scanning the string once
+                matches = _PATH_RE.findall(path_string)
+
                 # Check if the string has at least 2 numbers
-                if count_symbols(path_string) >= 2:
+                if len(matches) >= 2:
                     # Format the string
-                    formatted_string = format_path_string(path_string)
+                    formatted_string = _join_path_matches(matches)
 
                     # Extract the read name from the query name column
                     # Split on whitespace in case there is nanopore metadata in the name
@@ -97,12 +109,17 @@ def process_gaf_file(input_file: str, output_file: str) -> None:
                     # Increment path counter
                     path_counter += 1
 
-                    # Write new tab-delimited line to output file
-                    outfile.write(
+                    # Add new tab-delimited line to output batch
+                    out_lines.append(
                         f"P\tPath_{path_counter}:{read_name}\t{formatted_string}\t*\n"
                     )
+                    if len(out_lines) >= WRITE_BATCH_SIZE:
+                        outfile.writelines(out_lines)
+                        out_lines.clear()
             else:
                 logging.warning(f"Skipping malformed line:\n{line}")
+        # Write any remaining path lines
+        outfile.writelines(out_lines)
     # Summary
     logging.info(f"Read {line_counter} GAF alignments.")
     logging.info(f"Extracted {path_counter} paths with > 1 segment.")
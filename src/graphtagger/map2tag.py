@@ -7,21 +7,29 @@ Maps reads using minimap2, and calculates approximate mean depth per sequence.
 Outputs an assembly in the same format as input with depth information in DP tags.
 """
 
+from collections import defaultdict
+from typing import Dict, Iterable, Iterator, Optional, TextIO
 import argparse
-import gzip
 import logging
 import os
 import subprocess
 import sys
 import tempfile
+import threading
 
 from graphtagger.logs import init_logging
 from graphtagger.utils import (
     are_tools_available,
     is_valid_fasta_file,
     is_valid_gfa_file,
+    open_gzip,
 )
 
+# Read/write buffer size for streaming assemblies and alignments
+IO_BUFFER_SIZE = 1 << 20
+# Number of output lines collected before each write
+WRITE_BATCH_SIZE = 4096
+
 
 def parse_args():
     parser = argparse.ArgumentParser(
@@ -58,6 +66,12 @@ def parse_args():
         help="Minimap2 preset to use. Default: [map-ont]",
         default="map-ont",
     )
+    parser.add_argument(
+        "--keep_paf",
+        default=False,
+        action="store_true",
+        help="If set, keep minimap2 alignments in a PAF file with the same prefix as the output.",
+    )
     parser.add_argument(
         "--minimap2",
         help="Custom path to minimap2 executable [minimap2]",
@@ -164,14 +178,24 @@ def get_depth(
     reads: str,
     threads: int = 1,
     preset: str = "map-ont",
-    temp_dir: str = None,
+    *,
+    paffile: Optional[str] = None,
 ):
-    if not temp_dir:
-        temp_dir = os.getcwd()
-    # Init empty dict for contig depths
-    contig_depths = {}
-    # Set temp PAF location
-    paffile = temp_dir + "/reads2fasta.tmp.paf"
+    """
+    Map reads to an assembly with minimap2 and calculate the mean depth of each sequence.
+
+    Args:
+        fasta (str): Assembly to map reads to.
+        mmPath (str): Path to the minimap2 executable.
+        reads (str): Reads to map (fasta or fastq, can be gzipped).
+        threads (int): Number of minimap2 threads.
+        preset (str): minimap2 preset.
+        paffile (str, optional): Keyword-only. If set, also keep the minimap2 alignments in this PAF file.
+            Alignments are always parsed as minimap2 writes them.
+
+    Returns:
+        Dict[str, float]: Mean depth for each sequence with at least one alignment.
+    """
     # Prepare mm2 cmd
     command = [
         mmPath,
@@ -186,24 +210,48 @@ def get_depth(
     # Run the command
     try:
         logging.info(f"Call: {' '.join(command)}")
-        process = subprocess.run(
+        # Parse alignments from the minimap2 stdout pipe as they are written
+        logging.info("Parsing minimap2 output.")
+        with subprocess.Popen(
             command,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            check=True,
             text=True,
-        )
+            bufsize=IO_BUFFER_SIZE,
+        ) as process:
+            # Collect stderr in a background thread, so a full stderr pipe
+            # cannot block minimap2 while its stdout is being read.
+            stderr_chunks = []
+            stderr_reader = threading.Thread(
+                target=lambda: stderr_chunks.append(process.stderr.read()),
+                daemon=True,
+            )
+            stderr_reader.start()
+
+            if paffile:
+                # Copy alignments to the PAF file while they are parsed,
+                # so the file never has to be read back.
+                with open(paffile, "w", buffering=IO_BUFFER_SIZE) as output:
+                    contig_depths = parse_paf_depths(_tee_lines(process.stdout, output))
+            else:
+                contig_depths = parse_paf_depths(process.stdout)
+
+            stderr_reader.join()
+        mm2_stderr = "".join(stderr_chunks)
+
+        if process.returncode != 0:
+            raise subprocess.CalledProcessError(
+                process.returncode, command, stderr=mm2_stderr
+            )
 
         # Print stderr
         logging.info("=== Minimap2 STDERR ===")
-        logging.info(process.stderr)
-
-        # Write the result to the output file
-        with open(paffile, "w") as output:
-            output.write(process.stdout)
+        logging.info(mm2_stderr)
 
         # Check outfile in correct location
-        if os.path.isfile(paffile):
+        if not paffile:
+            logging.info("minimap2 completed successfully.")
+        elif os.path.isfile(paffile):
             logging.info(
                 f"minimap2 completed successfully. Output written to: {paffile}"
             )
@@ -217,24 +265,49 @@ def get_depth(
         logging.debug(e.stderr)
         sys.exit(1)
 
-    # Now we can parse the PAF file and determine the coverage of each contig
-    logging.info("Parsing minimap2 output.")
-    with open(paffile, "r") as f:
-        for line in f:
-            ls = line.split("\t")
-            if len(ls) < 11:
-                continue
-            contig = ls[5]
-            length_of_contig = int(ls[6])
-            start = int(ls[7])
-            end = int(ls[8])
-            if contig not in contig_depths:
-                contig_depths[contig] = 0.0
-            contig_depths[contig] += float(end - start) / float(length_of_contig)
-
     return contig_depths
 
 
+def _tee_lines(lines: Iterable[str], output: TextIO) -> Iterator[str]:
+    """Yield lines unchanged while also writing them to output (PRIVATE)."""
+    write = output.write
+    for line in lines:
+        write(line)
+        yield line
+
+
+def parse_paf_depths(paf_lines: Iterable[str]) -> Dict[str, float]:
+    """
+    Calculate the approximate mean depth of each target sequence from PAF alignments.
+
+    Depth is the total length of the target covered by alignments divided by the
+    target length.
+
+    Args:
+        paf_lines (Iterable[str]): Lines of a PAF file.
+
+    Returns:
+        Dict[str, float]: Mean depth for each target with at least one alignment.
+    """
+    # Sum aligned target bases per contig as ints, and divide by the contig
+    # length once at the end rather than for every alignment.
+    aligned_bases = defaultdict(int)
+    contig_lengths = {}
+    for line in paf_lines:
+        # Only the first 11 (of 12 required) columns are needed
+        ls = line.split("\t", 11)
+        if len(ls) < 11:
+            continue
+        contig = ls[5]
+        aligned_bases[contig] += int(ls[8]) - int(ls[7])
+        contig_lengths[contig] = ls[6]
+
+    return {
+        contig: aligned / int(contig_lengths[contig])
+        for contig, aligned in aligned_bases.items()
+    }
+
+
 def mktempfasta(input_gfa: str, temp_dir: str = None, is_gzipped: bool = False):
     if not temp_dir:
         temp_dir = os.getcwd()
@@ -242,95 +315,101 @@ def mktempfasta(input_gfa: str, temp_dir: str = None, is_gzipped: bool = False):
     out_fasta = f"{temp_dir}/temp.fasta"
     logging.info(f"Converting gfa to fasta file: {out_fasta}")
 
-    # Open temp fasta location for writing
-    with open(out_fasta, "w") as output_file:
+    # Open temp fasta location for writing.
+    # Lines are handled as bytes, as names and sequences are copied unchanged.
+    with open(out_fasta, "wb", buffering=IO_BUFFER_SIZE) as output_file:
         # Open the input file accordingly (regular or gzipped)
         logging.info(f"Reading seq records from: {input_gfa}")
-        with gzip.open(input_gfa, "rt") if is_gzipped else open(
-            input_gfa, "r"
+        with open_gzip(
+            input_gfa, "rb", buffer_size=IO_BUFFER_SIZE
+        ) if is_gzipped else open(
+            input_gfa, "rb", buffering=IO_BUFFER_SIZE
         ) as input_file:
             # Read gfa lines
             for line in input_file:
-                if line.startswith("S"):
-                    line = line.split("\t")
-                    output_file.write(">" + line[1] + "\n")
-                    output_file.write(line[2] + "\n")
+                if line.startswith(b"S"):
+                    line = line.split(b"\t", 3)
+                    output_file.write(b">%s\n%s\n" % (line[1], line[2]))
     # Return path to temp fasta
     return out_fasta
 
 
 def write_tags_to_file(infile, outfile, is_gfa, is_gzipped, depthDict):
     # Note: If no reads mapped, contig may be missing from depthDict.
+    # Lines are handled as bytes. Format and encode each DP tag once, rather
+    # than for every line that uses it.
+    dp_tags = {
+        contig.encode(): f"DP:f:{depth:.2f}".encode()
+        for contig, depth in depthDict.items()
+    }
+    # Output lines waiting to be written
+    out_lines = []
     # Update tags in a GFA
     if is_gfa:
-        with open(outfile, "w") as output_file:
+        with open(outfile, "wb", buffering=IO_BUFFER_SIZE) as output_file:
             logging.info(f"Writing updated tags to gfa: {outfile}")
             # Open the input file accordingly (regular or gzipped)
             logging.info(f"Reading seq records from: {infile}")
-            with gzip.open(infile, "rt") if is_gzipped else open(
-                infile, "r"
+            with open_gzip(
+                infile, "rb", buffer_size=IO_BUFFER_SIZE
+            ) if is_gzipped else open(
+                infile, "rb", buffering=IO_BUFFER_SIZE
             ) as input_file:
                 for line in input_file:
-                    if line.startswith("S"):
-                        fields = line.strip("\n").split("\t")
+                    if line.startswith(b"S"):
+                        fields = line.rstrip(b"\r\n").split(b"\t")
                         contig_name = fields[1]
-                        # This contig exists in depthDict
-                        if contig_name in depthDict:
-                            # Check for "DP" tags in optional columns
-                            dp_tags = [
-                                tag for tag in fields[3:] if tag.startswith("DP")
-                            ]
-                            # If existing DP tag found
-                            if dp_tags:
-                                # If "DP" tags exist, update the first one found
-                                fields[fields.index(dp_tags[0])] = (
-                                    f"DP:f:{depthDict[contig_name]:.2f}"
-                                )
-                            else:
-                                # If no "DP" tags exist, add a new one at the end
-                                fields.append(f"DP:f:{depthDict[contig_name]:.2f}")
-                        else:  # If contig not in dict, set DP to 0.0
-                            # Check for "DP" tags in optional columns
-                            dp_tags = [
-                                tag for tag in fields[3:] if tag.startswith("DP")
-                            ]
-                            # If existing DP tag found
-                            if dp_tags:
-                                # If "DP" tags exist, update the first one found
-                                fields[fields.index(dp_tags[0])] = "DP:f:0.0"
-                            else:
-                                # If no "DP" tags exist, add a new one at the end
-                                fields.append("DP:f:0.0")
-                        # Write the line to output
-                        output_file.write("\t".join(fields) + "\n")
+                        # If contig not in dict, set DP to 0.0
+                        dp_tag = dp_tags.get(contig_name, b"DP:f:0.0")
+                        # Find the first "DP" tag in optional columns
+                        for dp_idx in range(3, len(fields)):
+                            if fields[dp_idx].startswith(b"DP"):
+                                # If existing DP tag found, update it
+                                fields[dp_idx] = dp_tag
+                                break
+                        else:
+                            # If no "DP" tags exist, add a new one at the end
+                            fields.append(dp_tag)
+                        # Add the line to output
+                        out_lines.append(b"\t".join(fields) + b"\n")
                     else:
                         # Write non-segment line unchanged
-                        output_file.write(line)
+                        out_lines.append(line)
+                    if len(out_lines) >= WRITE_BATCH_SIZE:
+                        output_file.writelines(out_lines)
+                        out_lines.clear()
+                # Write any remaining lines
+                output_file.writelines(out_lines)
 
     else:  # Write tags to fasta
         logging.info(f"Writing updated tags to fasta: {outfile}")
-        with open(outfile, "w") as output_file:
+        with open(outfile, "wb", buffering=IO_BUFFER_SIZE) as output_file:
             # Open the input file accordingly (regular or gzipped)
             logging.info(f"Reading seq records from: {infile}")
-            with gzip.open(infile, "rt") if is_gzipped else open(
-                infile, "r"
+            with open_gzip(
+                infile, "rb", buffer_size=IO_BUFFER_SIZE
+            ) if is_gzipped else open(
+                infile, "rb", buffering=IO_BUFFER_SIZE
             ) as input_file:
                 # Read lines
                 for line in input_file:
-                    if line.startswith(">"):
-                        contig_name = line[1:].rstrip("\n").split(" ")[0]
-                        if contig_name in depthDict:
-                            depth = depthDict[contig_name]
+                    if line.startswith(b">"):
+                        contig_name = line[1:].rstrip(b"\r\n").split(b" ")[0]
+                        if contig_name in dp_tags:
+                            dp_tag = dp_tags[contig_name]
                         else:
                             logging.warning(
-                                f"No data found for sequence: {contig_name}"
+                                f"No data found for sequence: {contig_name.decode()}"
                             )
-                            depth = 0.0
-                        output_file.write(
-                            line.rstrip("\n") + " DP:f:" + f"{depth:.2f}" + "\n"
-                        )
+                            dp_tag = b"DP:f:0.00"
+                        out_lines.append(line.rstrip(b"\r\n") + b" " + dp_tag + b"\n")
                     else:
-                        output_file.write(line)
+                        out_lines.append(line)
+                    if len(out_lines) >= WRITE_BATCH_SIZE:
+                        output_file.writelines(out_lines)
+                        out_lines.clear()
+                # Write any remaining lines
+                output_file.writelines(out_lines)
 
 
 def main():
@@ -347,9 +426,16 @@ def main():
         logging.info(f"Open temp dir: {temp_dir}")
         # Check input files exist, correct format, and mm is accessible
         fasta_path, is_gfa, is_gzipped, outfile = validate_input(args, temp_dir)
+        # Keep alignments next to the output if requested
+        paffile = os.path.splitext(outfile)[0] + ".paf" if args.keep_paf else None
         # Map reads to fasta and get depth
         depthDict = get_depth(
-            fasta_path, args.minimap2, args.reads, args.threads, args.preset, temp_dir
+            fasta_path,
+            args.minimap2,
+            args.reads,
+            args.threads,
+            args.preset,
+            paffile=paffile,
         )
         # Write tags to output
         write_tags_to_file(args.input, outfile, is_gfa, is_gzipped, depthDict)
@@ -1,8 +1,18 @@
+from functools import lru_cache
 import re
 from typing import List, Tuple
 
 from graphtagger.seqOps import revComp
 
+# Optional: RE2 matches in linear time, without backtracking on repeat-dense regions
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+# Escaped form of each DNA base for regex patterns
+_ESCAPED = {base: re.escape(base) for base in "ACGTNacgtn"}
+
 
 def count_continuous_runs(dna_string: str) -> list:
     """
@@ -16,6 +26,9 @@ def count_continuous_runs(dna_string: str) -> list:
             of times it occurred consecutively in the input DNA string.
     """
 
+    # Only called on short motifs (twice per run, by get_flexi_motifs), where this
+    # plain loop is faster than itertools.groupby or a regex over runs.
+
     # Check if the input string is empty
     if not dna_string:
         return []
@@ -59,15 +72,27 @@ def construct_regex_pattern(motif_tuples: List[Tuple[str, int]]) -> str:
     pattern_parts = []
 
     for char, count in motif_tuples:
+        # DNA bases need no escaping; look up others with re.escape
+        char = _ESCAPED.get(char) or re.escape(char)
         if count == 1:
-            pattern_parts.append(
-                re.escape(char)
-            )  # If count is 1, just escape the character
+            pattern_parts.append(char)  # If count is 1, just use the character
         else:
             # If count is greater than 1, add a range allowing for plus or minus one
-            pattern_parts.append(rf"{re.escape(char)}{{{count-1},{count+1}}}")
+            pattern_parts.append(f"{char}{{{count - 1},{count + 1}}}")
+
+    return "".join(pattern_parts)
 
-    return rf"{''.join(pattern_parts)}"
+
+@lru_cache(maxsize=1024)
+def _compile_repeat_pattern(motif: str):
+    """Compile (and cache) the pattern matching tandem repeats of motif (PRIVATE).
+
+    Uses RE2 if available, otherwise the standard re module. Both report the
+    same leftmost, non-overlapping runs.
+    """
+    if re2 is not None:
+        return re2.compile(f"({motif})+")
+    return re.compile(f"({motif})+")
 
 
 def find_repeats_of_motif(text: str, motif: str) -> List[Tuple[int, int]]:
@@ -81,7 +106,7 @@ def find_repeats_of_motif(text: str, motif: str) -> List[Tuple[int, int]]:
     Returns:
         List[Tuple[int, int]]: A list of tuples containing start and end coordinates of motif matches.
     """
-    pattern = re.compile(f"({motif})+")
+    pattern = _compile_repeat_pattern(motif)
     matches = pattern.finditer(text)
 
     coordinates = []
@@ -93,6 +118,29 @@ def find_repeats_of_motif(text: str, motif: str) -> List[Tuple[int, int]]:
     return coordinates
 
 
+def find_repeats_of_motifs(
+    text: str, motifs: Tuple[str, ...]
+) -> List[List[Tuple[int, int]]]:
+    """
+    Find repeats of several motifs in a given text.
+
+    Args:
+        text (str): The input text to search for motifs.
+        motifs (Tuple[str, ...]): The motifs to search for, i.e. the fwd and rev
+            patterns from get_flexi_motifs().
+
+    Returns:
+        List[List[Tuple[int, int]]]: For each motif, a list of start and end coordinates of motif matches.
+    """
+    # Each motif is scanned separately, as the runs found for one motif may
+    # overlap the runs found for another.
+    return [
+        [match.span() for match in _compile_repeat_pattern(motif).finditer(text)]
+        for motif in motifs
+    ]
+
+
+@lru_cache(maxsize=1024)
 def get_flexi_motifs(motif: str) -> Tuple[str, str]:
     # Count consecutive runs of characters in a string
     motif_fwd_runs = count_continuous_runs(motif)
@@ -1,6 +1,116 @@
+from typing import BinaryIO, Iterable, Iterator, Tuple
+import hashlib
+
+from graphtagger.utils import advise_sequential, open_gzip
+
+# Optional: minimap2's C FASTA/FASTQ reader
+try:
+    import mappy
+except ImportError:
+    mappy = None
+
+# Optional: multi-threaded BLAKE3 hashing
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+# GFA tag used for each checksum algorithm.
+# B3 is not part of the GFA spec, so is only written if requested.
+HASH_TAGS = {"sha256": "SH", "blake3": "B3"}
+
+
+# Size (in characters) of the byte chunks made from each mappy sequence
+MAPPY_CHUNK_SIZE = 1 << 20
+
+# Translation table for complementing DNA strings
+_COMP = str.maketrans("ACGTNacgtn", "TGCANtgcan")
+
+
 def revComp(seq):
     """Rev comp DNA string."""
-    revcompl = lambda x: "".join(
-        [{"A": "T", "C": "G", "G": "C", "T": "A", "N": "N"}[B] for B in x][::-1]
-    )
-    return revcompl(seq)
+    return seq.translate(_COMP)[::-1]
+
+
+def sha256Hasher():
+    """New SHA-256 hash object for sequence checksums (SH tags).
+
+    Flagged as non-security use on Python >= 3.9 so OpenSSL's accelerated
+    implementation is used without FIPS restrictions.
+    """
+    try:
+        return hashlib.sha256(usedforsecurity=False)
+    except TypeError:
+        # Python 3.8 does not accept usedforsecurity
+        return hashlib.sha256()
+
+
+def seqHasher(hash_alg: str = "sha256"):
+    """New hash object for sequence checksums using hash_alg (see HASH_TAGS).
+
+    BLAKE3 hashes a single sequence on all available cores, so is much faster
+    than SHA-256 for very long segments. Raises ImportError if blake3 is
+    requested but not installed.
+    """
+    if hash_alg == "blake3":
+        if blake3 is None:
+            raise ImportError(
+                "BLAKE3 hashing requires the blake3 package: pip install blake3"
+            )
+        return blake3.blake3(max_threads=blake3.blake3.AUTO)
+    return sha256Hasher()
+
+
+def iterFastaChunks(handle: BinaryIO) -> Iterator[Tuple[bytes, Iterator[bytes]]]:
+    """Yield (id, chunks) for each record in a FASTA file opened in binary mode.
+
+    The id is the first word of the header line. Any text before the first
+    header is ignored. chunks is an iterator over the record's sequence lines,
+    so long sequences never have to be held in memory. As with
+    itertools.groupby, unconsumed chunks are skipped when the next record is
+    requested.
+    """
+    lines = iter(handle)
+    next_header = [next((line for line in lines if line.startswith(b">")), None)]
+
+    def chunks() -> Iterator[bytes]:
+        for line in lines:
+            if line.startswith(b">"):
+                next_header[0] = line
+                return
+            yield line.rstrip()
+        next_header[0] = None
+
+    while next_header[0] is not None:
+        name = (next_header[0][1:].split(None, 1) or [b""])[0]
+        record_chunks = chunks()
+        yield name, record_chunks
+        # Skip to the next header if the caller did not read the whole record
+        for _ in record_chunks:
+            pass
+
+
+def _encodeChunks(seq: str, chunk_size: int = MAPPY_CHUNK_SIZE) -> Iterator[bytes]:
+    """Yield a sequence string as bytes, chunk_size characters at a time (PRIVATE)."""
+    for start in range(0, len(seq), chunk_size):
+        yield seq[start : start + chunk_size].encode()
+
+
+def readFastaChunks(input_fasta: str) -> Iterator[Tuple[bytes, Iterable[bytes]]]:
+    """Yield (id, chunks) for each record in a FASTA file, which may be gzipped.
+
+    Uses mappy's C reader if it is installed. mappy returns each sequence as a
+    single string, which is encoded in MAPPY_CHUNK_SIZE chunks so that a full
+    bytes copy of a long record is never held. Otherwise records are streamed
+    line by line with iterFastaChunks.
+    """
+    if mappy is not None:
+        for name, seq, _ in mappy.fastx_read(input_fasta, read_comment=False):
+            yield name.encode(), _encodeChunks(seq)
+        return
+
+    with open_gzip(input_fasta, "rb") if input_fasta.endswith(".gz") else open(
+        input_fasta, "rb"
+    ) as handle:
+        advise_sequential(handle)
+        yield from iterFastaChunks(handle)
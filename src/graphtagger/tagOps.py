@@ -1,161 +1,168 @@
-import hashlib
 import logging
 import re
 
+from graphtagger.seqOps import blake3, seqHasher
+
 # Based on functions from BiopythonBio/SeqIO/GfaIO.py
 # By @michaelfm1211
 
+# Tag name and value patterns. These RegExs are part of the 1.0 standard.
+_TAG_NAME = re.compile(r"[A-Za-z][A-Za-z0-9]")
+_TYPE_A = re.compile(r"[!-~]")
+_TYPE_I = re.compile(r"[-+]?[0-9]+")
+_TYPE_F = re.compile(r"[-+]?[0-9]*\.?[0-9]+([eE][-+]?[0-9]+)?")
+# Shared by Z (string) and J (JSON) types
+_TYPE_ZJ = re.compile(r"[ !-~]+")
+_TYPE_H = re.compile(r"[0-9A-Fa-f]+")
+_TYPE_B = re.compile(r"[cCsSiIf](,[-+]?[0-9]*\.?[0-9]+([eE][-+]?[0-9]+)?)+")
+
+# Value pattern and description for each tag type
+_VALIDATORS = {
+    "A": (_TYPE_A, "printable character"),
+    "i": (_TYPE_I, "signed integer"),
+    "f": (_TYPE_F, "float"),
+    "Z": (_TYPE_ZJ, "printable string"),
+    "J": (_TYPE_ZJ, "JSON excluding new-line and tab characters"),
+    "H": (_TYPE_H, "byte array in hex format"),
+    "B": (_TYPE_B, "array of integers or floats"),
+}
+
+# Tags checked against the segment sequence by _check_tag_values
+_CHECKED_TAGS = frozenset(("LN:", "SH:", "B3:"))
+
 
 def _check_tag_values(name, seq, tags):
-    """Check a segment line's tags for inconsistencies (PRIVATE)."""
+    """Check a segment line's tags for inconsistencies (PRIVATE).
+
+    Checks LN against the sequence length, and SH against its SHA256 checksum.
+    Non-standard B3 (BLAKE3) checksum tags, as written by --hash_alg blake3,
+    are also checked if the blake3 package is installed.
+    """
+    # Checksum of seq, calculated when the first SH tag is found
+    checksum = None
     for tag in tags:
-        if tag[:2] == "LN":
+        # Tag name and separator, sliced once per tag. Most tags are none of
+        # these, and are skipped with a single set lookup.
+        head = tag[:3]
+        if head not in _CHECKED_TAGS:
+            continue
+        if head == "LN:":
             if int(tag[5:]) != len(seq):
                 logging.warning(
-                    f"Segment line '{name}' has incorrect length. Expected {len(seq)} but got {tag[5:]}."
+                    "Segment line '%s' has incorrect length. Expected %d but got %s.",
+                    name,
+                    len(seq),
+                    tag[5:],
                 )
-        elif tag[:2] == "SH":
-            # SHA256 checksum
-            checksum = hashlib.sha256(str(seq).encode()).hexdigest()
+        elif head == "SH:":
+            # SHA256 checksum, hashed at most once per segment
+            if checksum is None:
+                checksum = _seq_hexdigest(seq)
             if checksum.upper() != tag[5:]:
                 logging.warning(
-                    f"Segment line '{name}' has incorrect checksum. Expected {checksum} but got {tag[5:]}.",
+                    "Segment line '%s' has incorrect checksum. Expected %s but got %s.",
+                    name,
+                    checksum,
+                    tag[5:],
+                )
+        elif head == "B3:" and blake3 is not None:
+            # BLAKE3 checksum. Hex case is not significant.
+            b3_checksum = _seq_hexdigest(seq, "blake3")
+            if b3_checksum.upper() != tag[5:].upper():
+                logging.warning(
+                    "Segment line '%s' has incorrect checksum. Expected %s but got %s.",
+                    name,
+                    b3_checksum,
+                    tag[5:],
                 )
 
 
-def _tags_to_annotations(tags):
-    """Build an annotations dictionary from a list of tags (PRIVATE)."""
-    annotations = {}
-    for tag in tags:
-        parts = tag.split(":")
-        if len(parts) < 3:
-            logging.error(f"Segment line has invalid tag: {tag}.")
-        # Tag name must only be two alphanumeric characters
-        if re.fullmatch(r"[A-Za-z][A-Za-z0-9]", parts[0]) is None:
-            logging.warning(
-                f"Tag has invalid name: {parts[0]}. Are tags tab delimited?",
-            )
-        # Reassemble downstream splits in the value in case it contained ":" characters.
-        parts[2] = ":".join(parts[2:])  # tag value may contain : characters
+def _seq_hexdigest(seq, hash_alg="sha256"):
+    """Hex digest of a sequence using hash_alg, "sha256" or "blake3" (PRIVATE).
 
-        # Add annotation to dict
-        annotations[parts[0]] = (parts[1], parts[2])
+    Sequence may be passed as str, raw bytes or a Biopython Seq; bytes-like
+    sequences are hashed without a copy.
+    """
+    if isinstance(seq, str):
+        seq = seq.encode()
+    elif not isinstance(seq, (bytes, bytearray, memoryview)):
+        seq = bytes(seq)
+    hasher = seqHasher(hash_alg)
+    hasher.update(seq)
+    return hasher.hexdigest()
 
-        # Check type of the tag and raise warning on a mismatch. These RegExs
-        # are part of the 1.0 standard.
-        if parts[1] not in "AifZJHB":
-            logging.warning(f"Tag has invalid type: {parts[1]}")
-        elif parts[1] == "A" and re.fullmatch(r"[!-~]", parts[2]) is None:
-            logging.warning(
-                f"Tag has incorrect type. Expected printable character, got {parts[2]}."
-            )
-        elif parts[1] == "i" and re.fullmatch(r"[-+]?[0-9]+", parts[2]) is None:
-            logging.warning(
-                f"Tag has incorrect type. Expected signed integer, got {parts[2]}."
-            )
-        elif (
-            parts[1] == "f"
-            and re.fullmatch(r"[-+]?[0-9]*\.?[0-9]+([eE][-+]?[0-9]+)?", parts[2])
-            is None
-        ):
-            logging.warning(f"Tag has incorrect type. Expected float, got {parts[2]}.")
-        elif parts[1] == "Z" and re.fullmatch(r"[ !-~]+", parts[2]) is None:
-            logging.warning(
-                f"Tag has incorrect type. Expected printable string, got {parts[2]}."
-            )
-        elif parts[1] == "J" and re.fullmatch(r"[ !-~]+", parts[2]) is None:
-            logging.warning(
-                f"Tag has incorrect type. Expected JSON excluding new-line and tab characters, got {parts[2]}."
-            )
-        elif parts[1] == "H" and re.fullmatch(r"[0-9A-Fa-f]+", parts[2]) is None:
-            logging.warning(
-                f"Tag has incorrect type. Expected byte array in hex format, got {parts[2]}."
-            )
-        elif (
-            parts[1] == "B"
-            and re.fullmatch(
-                r"[cCsSiIf](,[-+]?[0-9]*\.?[0-9]+([eE][-+]?[0-9]+)?)+", parts[2]
-            )
-            is None
-        ):
-            logging.warning(
-                f"Tag has incorrect type. Expected array of integers or floats, got {parts[2]}.",
-            )
-    return annotations
 
+def _parse_and_validate_tags(
+    tags, build_annotations=True, validate=True, fail_fast=False
+):
+    """Parse and check a list of tags in a single pass (PRIVATE).
 
-def _validate_tags(tags):
-    """Build an annotations dictionary from a list of tags (PRIVATE)."""
+    Returns a tuple of (annotations, is_valid). annotations maps tag names to
+    (type, value) tuples and is empty if build_annotations is False. is_valid
+    is False if any tag breaks the GFA 1.0 spec; the stricter checks on ':'
+    in tag values are only run if validate is True. If fail_fast is True,
+    stop at the first invalid tag; annotations then only cover the tags read.
+    """
+    annotations = {}
     # Init status checker
     tag_is_vaild = True
 
     for tag in tags:
-        parts = tag.split(":")
+        # Caller only needs to know if any tag is invalid
+        if fail_fast and not tag_is_vaild:
+            break
+        # Split on the first two ":" only. The value may contain ":" characters.
+        parts = tag.split(":", 2)
         if len(parts) < 3:
-            logging.error(f"Segment line has invalid tag: {tag}.")
+            logging.error("Segment line has invalid tag: %s.", tag)
             tag_is_vaild = False
+            # No type or value to check
+            continue
         # Tag name must only be two alphanumeric characters
-        if re.fullmatch(r"[A-Za-z][A-Za-z0-9]", parts[0]) is None:
+        if _TAG_NAME.fullmatch(parts[0]) is None:
             logging.warning(
-                f"Tag has invalid name: {parts[0]}. Are tags tab delimited?",
+                "Tag has invalid name: %s. Are tags tab delimited?", parts[0]
             )
             tag_is_vaild = False
-        # Reassemble downstream splits in the value in case it contained ":" characters.
-        parts[2] = ":".join(parts[2:])  # tag value may contain : characters
+
+        # Add annotation to dict
+        if build_annotations:
+            annotations[parts[0]] = (parts[1], parts[2])
 
         # Log error if ":" in value of non-JSON tag
-        if ":" in parts[2] and parts[1] != "J":
+        if validate and ":" in parts[2] and parts[1] != "J":
             logging.error(
-                f"Non-JSON-type tag contains character ':' in value field. This is probably an error!: {tag}"
+                "Non-JSON-type tag contains character ':' in value field. This is probably an error!: %s",
+                tag,
             )
             tag_is_vaild = False
         # Check type of the tag and raise warning on a mismatch. These RegExs
         # are part of the 1.0 standard.
-        if parts[1] not in "AifZJHB":
-            logging.warning(f"Tag has invalid type: {parts[1]}")
-            tag_is_vaild = False
-        elif parts[1] == "A" and re.fullmatch(r"[!-~]", parts[2]) is None:
-            logging.warning(
-                f"Tag has incorrect type. Expected printable character, got {parts[2]}."
-            )
-            tag_is_vaild = False
-        elif parts[1] == "i" and re.fullmatch(r"[-+]?[0-9]+", parts[2]) is None:
-            logging.warning(
-                f"Tag has incorrect type. Expected signed integer, got {parts[2]}."
-            )
-            tag_is_vaild = False
-        elif (
-            parts[1] == "f"
-            and re.fullmatch(r"[-+]?[0-9]*\.?[0-9]+([eE][-+]?[0-9]+)?", parts[2])
-            is None
-        ):
-            logging.warning(f"Tag has incorrect type. Expected float, got {parts[2]}.")
-            tag_is_vaild = False
-        elif parts[1] == "Z" and re.fullmatch(r"[ !-~]+", parts[2]) is None:
-            logging.warning(
-                f"Tag has incorrect type. Expected printable string, got {parts[2]}."
-            )
+        validator = _VALIDATORS.get(parts[1])
+        if validator is None:
+            logging.warning("Tag has invalid type: %s", parts[1])
             tag_is_vaild = False
-        elif parts[1] == "J" and re.fullmatch(r"[ !-~]+", parts[2]) is None:
+        elif validator[0].fullmatch(parts[2]) is None:
             logging.warning(
-                f"Tag has incorrect type. Expected JSON excluding new-line and tab characters, got {parts[2]}."
-            )
-            tag_is_vaild = False
-        elif parts[1] == "H" and re.fullmatch(r"[0-9A-Fa-f]+", parts[2]) is None:
-            logging.warning(
-                f"Tag has incorrect type. Expected byte array in hex format, got {parts[2]}."
-            )
-            tag_is_vaild = False
-        elif (
-            parts[1] == "B"
-            and re.fullmatch(
-                r"[cCsSiIf](,[-+]?[0-9]*\.?[0-9]+([eE][-+]?[0-9]+)?)+", parts[2]
-            )
-            is None
-        ):
-            logging.warning(
-                f"Tag has incorrect type. Expected array of integers or floats, got {parts[2]}.",
+                "Tag has incorrect type. Expected %s, got %s.", validator[1], parts[2]
             )
             tag_is_vaild = False
 
-    return tag_is_vaild
+    return annotations, tag_is_vaild
+
+
+def _tags_to_annotations(tags):
+    """Build an annotations dictionary from a list of tags (PRIVATE)."""
+    return _parse_and_validate_tags(tags, validate=False)[0]
+
+
+def _validate_tags(tags, fail_fast=False):
+    """Check a list of tags against the GFA 1.0 spec (PRIVATE).
+
+    If fail_fast is True, return False at the first invalid tag rather than
+    checking (and logging) every tag.
+    """
+    _, tag_is_valid = _parse_and_validate_tags(
+        tags, build_annotations=False, fail_fast=fail_fast
+    )
+    return tag_is_valid
@@ -1,25 +1,65 @@
+from functools import partial
 from typing import List, Tuple, Optional
 import argparse
-import gzip
 import logging
-import os.path
-import sys
 
-from Bio import SeqIO
+from Bio.SeqIO.FastaIO import SimpleFastaParser
 
 from graphtagger.logs import init_logging
-from graphtagger.motifs import get_flexi_motifs, find_repeats_of_motif
+from graphtagger.motifs import get_flexi_motifs, find_repeats_of_motifs
 from graphtagger.seqOps import revComp
-from graphtagger.utils import is_valid_fasta_file
+from graphtagger.utils import (
+    advise_sequential,
+    default_output_path,
+    is_valid_fasta_file,
+    map_ordered,
+    open_gzip,
+)
 
 
 # TODO: Choose either "-" strand or rev comp "name" for output bed.
 # TODO: Support GFA as input format.
 # TODO: Make bed work with BandageNG
 
+# BED header line
+BED_HEADER = b"#chrom\tchromStart\tchromEnd\tname\tscore\tstrand\n"
+# Write buffer size for the output BED file
+IO_BUFFER_SIZE = 1 << 20
+
+
+def search_record(
+    record: Tuple[str, str], motifs: Tuple[str, ...], minreplen: int = 0
+) -> Tuple[str, List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """
+    Search a FASTA record for repeats of the fwd and rev flexi motifs.
+
+    Args:
+        record (Tuple[str, str]): FASTA title and sequence.
+        motifs (Tuple[str, ...]): Fwd and rev patterns from get_flexi_motifs().
+        minreplen (int): Only report hits longer than this.
+
+    Returns:
+        Tuple[str, List[Tuple[int, int]], List[Tuple[int, int]]]: Record id and
+            the fwd and rev motif hits longer than minreplen.
+    """
+    title, seq = record
+    # Record id is the first word of the title
+    seq_id = (title.split(None, 1) or [""])[0]
+    # Drop short hits here, so that worker processes only send back the hits
+    # that will be reported.
+    fwd_hits, rev_hits = [
+        [(start, end) for start, end in hits if end - start > minreplen]
+        for hits in find_repeats_of_motifs(seq, motifs)
+    ]
+    return seq_id, fwd_hits, rev_hits
+
 
 def process_fasta(
-    input_file: str, output_file: str, motif: str, minrep: Optional[int] = 1
+    input_file: str,
+    output_file: str,
+    motif: str,
+    minrep: Optional[int] = 1,
+    threads: int = 1,
 ) -> None:
     """
     Process a FASTA file, search for motif repeats, and write results to a BED file.
@@ -28,6 +68,8 @@ def process_fasta(
         input_file (str): Path to the input FASTA file.
         output_file (str): Path to the output BED file.
         motif (str): The motif to search for in each sequence.
+        minrep (int, optional): Minimum number of sequential motif matches to report.
+        threads (int): Number of worker processes used to search records.
     """
 
     # Validate the input file
@@ -39,64 +81,68 @@ def process_fasta(
 
     # If output_bed is not provided, derive the output filename based on input
     if output_file is None:
-        if is_gzipped:
-            file_root, base_ext = os.path.splitext(input_file)
-            output_file = os.path.splitext(file_root)[0] + ".bed"
-        else:
-            output_file = os.path.splitext(input_file)[0] + ".bed"
+        output_file = default_output_path(input_file, ".bed")
 
     # Min length of sequential pattern matchs to report
     minreplen = len(motif) * minrep
 
-    # Set default score value
-    score = "."
-
     # Generate flexible fwd/rev regex patterns from base motif
     motifs = get_flexi_motifs(motif)
     revMotif = revComp(motif)
 
+    # Fixed name and strand columns for fwd and rev hits, encoded once.
+    # Any "%" is escaped, as these are used as %-format templates.
+    fwd_suffix = b"\t%s\t%%d\t+\n" % motif.encode().replace(b"%", b"%%")
+    rev_suffix = b"\t%s\t%%d\t-\n" % revMotif.encode().replace(b"%", b"%%")
+
     # Open output bed file
     logging.info(f"Writing gfa to file: {output_file}")
-    with open(output_file, "w") as output_bed:
-        output_bed.write("#chrom\tchromStart\tchromEnd\tname\tscore\tstrand\n")
+    with open(output_file, "wb", buffering=IO_BUFFER_SIZE) as output_bed:
+        output_bed.write(BED_HEADER)
 
         logging.info(f"Reading seq records from: {input_file}")
-        with gzip.open(input_file, "rt") if is_gzipped else open(
+        # Gzipped input is read with the fastest available decompressor
+        with open_gzip(input_file, "rt") if is_gzipped else open(
             input_file, "r"
         ) as input_handle:
+            advise_sequential(input_handle)
             seq_count = 0
             pos_seq_count = 0
             total_hits = 0
-            for record in SeqIO.parse(input_handle, "fasta"):
-                logging.info(f"Searching sequence: {record.id}")
-
-                # Search for forward orientation of flexi motif
-                hits = find_repeats_of_motif(str(record.seq), motifs[0])
-                strand = "+"
-                fwd_count = 0
-                for start, end in hits:
-                    if int(end) - int(start) > minreplen:
-                        score = int(end) - int(start)
-                        output_bed.write(
-                            f"{record.id}\t{start}\t{end}\t{motif}\t{score}\t{strand}\n"
-                        )
-                        fwd_count += 1
+            # Read (title, sequence) string pairs, without building SeqRecords.
+            # Search for fwd and rev orientations of flexi motif in each record,
+            # in parallel if threads > 1. Results are reported in input order.
+            records = SimpleFastaParser(input_handle)
+            search = partial(search_record, motifs=motifs, minreplen=minreplen)
+            for seq_id, fwd_hits, rev_hits in map_ordered(
+                search, records, threads, processes=True
+            ):
+                logging.info("Searched sequence: %s", seq_id)
+
+                # BED lines for this record, written in one call. Lines are
+                # formatted as bytes from a prefix and suffix built once per record.
+                prefix = seq_id.encode().replace(b"%", b"%%") + b"\t"
+                fwd_line = prefix + b"%d\t%d" + fwd_suffix
+                rev_line = prefix + b"%d\t%d" + rev_suffix
+                bed_lines = []
+
+                # Report forward orientation hits, already filtered by length
+                for start, end in fwd_hits:
+                    bed_lines.append(fwd_line % (start, end, end - start))
+                fwd_count = len(fwd_hits)
                 if fwd_count > 0:
-                    logging.info(f"Fwd motif runs found: {fwd_count}")
-
-                # Search for reverse orientation of flexi motif
-                hits = find_repeats_of_motif(str(record.seq), motifs[1])
-                strand = "-"
-                rev_count = 0
-                for start, end in hits:
-                    if int(end) - int(start) > minreplen:
-                        score = int(end) - int(start)
-                        output_bed.write(
-                            f"{record.id}\t{start}\t{end}\t{revMotif}\t{score}\t{strand}\n"
-                        )
-                        rev_count += 1
+                    logging.info("Fwd motif runs found: %d", fwd_count)
+
+                # Report reverse orientation hits
+                for start, end in rev_hits:
+                    bed_lines.append(rev_line % (start, end, end - start))
+                rev_count = len(rev_hits)
                 if rev_count > 0:
-                    logging.info(f"Rev motif runs found: {rev_count}")
+                    logging.info("Rev motif runs found: %d", rev_count)
+
+                # Write hits for this record
+                if bed_lines:
+                    output_bed.write(b"".join(bed_lines))
 
                 # Increment count of motif positive sequences if any hits found
                 if fwd_count or rev_count:
@@ -144,6 +190,13 @@ def getArgs():
         type=int,
         help="Minimum number of sequential pattern matches required for a hit to be reported. Default: 3",
     )
+    parser.add_argument(
+        "-t",
+        "--threads",
+        default=1,
+        type=int,
+        help="Number of records to search in parallel. Default: [1]",
+    )
 
     # Parse command line arguments
     return parser.parse_args()
@@ -158,7 +211,11 @@ def main():
 
     # Convert FASTA to GFA
     process_fasta(
-        args.input_fasta, args.output_bed, args.motif, minrep=args.min_repeats
+        args.input_fasta,
+        args.output_bed,
+        args.motif,
+        minrep=args.min_repeats,
+        threads=args.threads,
     )
 
 
@@ -1,9 +1,25 @@
-from typing import List, Optional
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import IO, Callable, Iterable, Iterator, List, Optional
+import gzip
+import io
 import logging
+import os
 import os.path
 import shutil
 import sys
 
+# Optional faster gzip decompressors, in order of preference
+try:
+    import rapidgzip
+except ImportError:
+    rapidgzip = None
+
+try:
+    from isal import igzip
+except ImportError:
+    igzip = None
+
 
 def are_tools_available(tool_names: List[str], strict: Optional[bool] = False) -> None:
     """
@@ -31,81 +47,208 @@ def are_tools_available(tool_names: List[str], strict: Optional[bool] = False) -
         sys.exit(1)
 
 
-def is_valid_fasta_file(input_fasta: str) -> bool:
+def open_gzip(path: str, mode: str = "rb", buffer_size: int = 1 << 20) -> IO:
     """
-    Check if the input file is a valid FASTA file.
+    Open a gzipped file for reading with the fastest available decompressor.
+
+    Uses rapidgzip (parallel decompression) or isal (ISA-L) if installed,
+    falling back to the standard gzip module.
 
     Args:
-        input_fasta (str): Path to the input FASTA file.
+        path (str): Path to the gzipped file.
+        mode (str): "rb" for binary or "rt" for text.
+        buffer_size (int): Read buffer size in bytes.
 
     Returns:
-        bool: True if the file is a valid FASTA file, False otherwise.
+        IO: A buffered file object.
     """
-    valid_extensions = [".fa", ".fasta", ".fna"]
+    if rapidgzip is not None:
+        raw = rapidgzip.open(path, parallelization=os.cpu_count())
+    elif igzip is not None:
+        raw = igzip.open(path, "rb")
+    else:
+        raw = gzip.open(path, "rb")
+
+    handle = io.BufferedReader(raw, buffer_size=buffer_size)
+    if mode == "rt":
+        return io.TextIOWrapper(handle)
+    return handle
+
+
+def _fadvise(handle: IO, offset: int, length: int, advice: str) -> None:
+    """Pass an access pattern hint for handle's file to the OS, if supported (PRIVATE)."""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        os.posix_fadvise(handle.fileno(), offset, length, getattr(os, advice))
+    except (AttributeError, OSError, ValueError):
+        # Not backed by a real file descriptor, i.e. rapidgzip readers
+        pass
+
+
+def advise_sequential(handle: IO) -> None:
+    """
+    Hint that handle will be read sequentially, so the OS reads ahead more aggressively.
 
-    if not os.path.isfile(input_fasta):
-        logging.error(f"Input file '{input_fasta}' does not exist.")
-        return False
+    For gzip readers the hint is applied to the underlying compressed file.
+    Does nothing on platforms without posix_fadvise.
+
+    Args:
+        handle (IO): An open file object.
+    """
+    _fadvise(handle, 0, 0, "POSIX_FADV_SEQUENTIAL")
+
+
+def drop_read_pages(handle: IO) -> None:
+    """
+    Tell the OS that the part of handle's file already read will not be needed again.
+
+    Keeps large inputs from filling the page cache. Does nothing on platforms
+    without posix_fadvise.
+
+    Args:
+        handle (IO): An open file object.
+    """
+    try:
+        position = os.lseek(handle.fileno(), 0, os.SEEK_CUR)
+    except (AttributeError, OSError, ValueError):
+        return
+    # A length of 0 would apply to the whole file
+    if position > 0:
+        _fadvise(handle, 0, position, "POSIX_FADV_DONTNEED")
+
+
+def iter_line_blocks(handle: IO, block_size: int = 16 << 20) -> Iterator[List[bytes]]:
+    """
+    Read a binary file in large blocks and yield each block as a list of lines.
+
+    Each block is extended to the end of its last line, so no line is split
+    between blocks. Lines are returned without their trailing newline.
+
+    Args:
+        handle (IO): A file object opened in binary mode.
+        block_size (int): Approximate number of bytes read per block.
+
+    Yields:
+        List[bytes]: The lines in the next block.
+    """
+    while True:
+        block = handle.read(block_size)
+        if not block:
+            return
+        # Finish the last line in the block
+        if not block.endswith(b"\n"):
+            block += handle.readline()
+        lines = block.split(b"\n")
+        # Drop the empty string after the final newline
+        if not lines[-1]:
+            lines.pop()
+        yield lines
+
+
+def default_output_path(input_file: str, suffix: str) -> str:
+    """
+    Derive an output file name by replacing the extension of input_file with suffix.
 
-    # Extract the file extension, considering .gz if present
-    file_root, base_ext = os.path.splitext(input_fasta)
-    _, upstream_ext = os.path.splitext(file_root)
+    A trailing .gz is removed before the file extension is replaced.
+
+    Args:
+        input_file (str): Path to the input file.
+        suffix (str): New extension, i.e. ".gfa".
+
+    Returns:
+        str: Path to the output file.
+    """
+    if input_file.endswith(".gz"):
+        input_file = input_file[:-3]
+    return os.path.splitext(input_file)[0] + suffix
+
+
+# Supported file extensions, each of which may be followed by .gz
+FASTA_EXTENSIONS = (".fa", ".fasta", ".fna")
+GFA_EXTENSIONS = (".gfa",)
 
-    # Check if the file is gzipped
-    is_gzipped = base_ext.lower() == ".gz"
 
-    if is_gzipped and upstream_ext.lower() not in valid_extensions:
-        logging.error(
-            f"Invalid file extension for '{input_fasta}'. Supported extensions are {', '.join(valid_extensions)}. These may be followed by .gz"
-        )
+def _check_ext(path: str, valid_extensions: tuple, silent: bool = False) -> bool:
+    """Check that path is an existing file with one of valid_extensions, optionally gzipped (PRIVATE)."""
+    if not os.path.isfile(path):
+        if not silent:
+            logging.error(f"Input file '{path}' does not exist.")
         return False
 
-    # Check if the file extension is valid
-    elif not is_gzipped and base_ext.lower() not in valid_extensions:
-        logging.error(
-            f"Invalid file extension for '{input_fasta}'. Supported extensions are {', '.join(valid_extensions)}."
-        )
+    # Lowercase once, and strip .gz to check the extension before it
+    name = path.lower()
+    is_gzipped = name.endswith(".gz")
+    if is_gzipped:
+        name = name[:-3]
+
+    if os.path.splitext(name)[1] not in valid_extensions:
+        if not silent:
+            gz_note = " These may be followed by .gz" if is_gzipped else ""
+            logging.error(
+                f"Invalid file extension for '{path}'. Supported extensions are {', '.join(valid_extensions)}.{gz_note}"
+            )
         return False
 
     return True
 
 
+def is_valid_fasta_file(input_fasta: str) -> bool:
+    """
+    Check if the input file is a valid FASTA file.
+
+    Args:
+        input_fasta (str): Path to the input FASTA file.
+
+    Returns:
+        bool: True if the file is a valid FASTA file, False otherwise.
+    """
+    return _check_ext(input_fasta, FASTA_EXTENSIONS)
+
+
 def is_valid_gfa_file(input_gfa: str, silent: bool = False) -> bool:
     """
     Check if the input file is a valid GFA file.
 
     Args:
         input_gfa (str): Path to the input GFA file.
+        silent (bool): If True, do not log errors.
 
     Returns:
         bool: True if the file is a valid GFA file, False otherwise.
     """
-    valid_extensions = [".gfa"]
-
-    if not os.path.isfile(input_gfa):
-        logging.error(
-            f"Input file '{input_gfa}' does not exist."
-        ) if not silent else None
-        return False
+    return _check_ext(input_gfa, GFA_EXTENSIONS, silent=silent)
 
-    # Extract the file extension, considering .gz if present
-    file_root, base_ext = os.path.splitext(input_gfa)
-    _, upstream_ext = os.path.splitext(file_root)
 
-    # Check if the file is gzipped
-    is_gzipped = base_ext.lower() == ".gz"
+def map_ordered(
+    func: Callable, items: Iterable, threads: int = 1, processes: bool = False
+) -> Iterator:
+    """
+    Apply func to each item using a pool of threads, yielding results in input order.
 
-    if is_gzipped and upstream_ext.lower() not in valid_extensions:
-        logging.error(
-            f"Invalid file extension for '{input_gfa}'. Supported extensions are {', '.join(valid_extensions)}. These may be followed by .gz"
-        ) if not silent else None
-        return False
+    At most 2 x threads items are in flight at once, so large inputs are streamed
+    rather than read into memory up front.
 
-    # Check if the file extension is valid
-    elif not is_gzipped and base_ext.lower() not in valid_extensions:
-        logging.error(
-            f"Invalid file extension for '{input_gfa}'. Supported extensions are {', '.join(valid_extensions)}."
-        ) if not silent else None
-        return False
+    Args:
+        func (Callable): Function to apply to each item.
+        items (Iterable): Items to process.
+        threads (int): Number of workers. If <= 1, items are processed in the calling thread.
+        processes (bool): If True, use worker processes instead of threads, for
+            CPU-bound functions that hold the GIL. func and items must be picklable.
 
-    return True
+    Returns:
+        Iterator: Results of func, in the same order as items.
+    """
+    if threads <= 1:
+        yield from map(func, items)
+        return
+
+    pool = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with pool(max_workers=threads) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(func, item))
+            if len(pending) >= 2 * threads:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()